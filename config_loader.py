@@ -0,0 +1,9 @@
+import functools
+import yaml
+
+
+@functools.lru_cache(maxsize=1)
+def load_config(path='config.yaml'):
+    """Parse config.yaml once and share the dict across the pipeline."""
+    with open(path, 'r') as f:
+        return yaml.safe_load(f)
@@ -1,49 +1,71 @@
-import json
-import yaml
-import requests
+import asyncio
+import orjson
+import aiohttp
 import os
-import time
+from aiohttp_client_cache import CachedSession, SQLiteBackend
+from config_loader import load_config
 from datetime import datetime, timedelta
+from pybloom_live import ScalableBloomFilter
 
 
 class StockNewsCrawler:
     def __init__(self):
-        with open('config.yaml', 'r') as f:
-            self.config = yaml.safe_load(f)
-        self.checkpoint_file = os.path.join(self.config.get('data_path', 'data'), self.config.get('checkpoint_file', 'checkpoint.json'))
-        self.collected_urls = set()
+        self.config = load_config()
+        self.checkpoint_file = os.path.join(self.config.get('data_path', 'data'), self.config.get('checkpoint_file', 'checkpoint.jsonl'))
+        # Bloom filter keeps URL dedup memory tiny (~2 MB per 1M URLs at
+        # 0.1% false-positive rate); no false negatives, so nothing is
+        # ever collected twice
+        self.collected_urls = ScalableBloomFilter(initial_capacity=100000, error_rate=0.001)
+        self.new_urls = []
         self.load_checkpoint()
-    
+
     def load_checkpoint(self):
         if os.path.exists(self.checkpoint_file):
             try:
-                with open(self.checkpoint_file, 'r') as f:
-                    checkpoint = json.load(f)
-                    self.collected_urls = set(checkpoint.get('collected_urls', []))
-                    print(f"Loaded checkpoint with {len(self.collected_urls)} existing URLs")
+                with open(self.checkpoint_file, 'rb') as f:
+                    for line in f:
+                        if line.strip():
+                            self.collected_urls.add(orjson.loads(line)['url'])
+                print(f"Loaded checkpoint with {len(self.collected_urls)} existing URLs")
+                return
             except Exception as e:
                 print(f"Error loading checkpoint: {e}")
-                self.collected_urls = set()
-    
+                self.collected_urls = ScalableBloomFilter(initial_capacity=100000, error_rate=0.001)
+
+        # Migrate the legacy rewrite-all checkpoint.json on first run
+        legacy_file = os.path.splitext(self.checkpoint_file)[0] + '.json'
+        if os.path.exists(legacy_file):
+            try:
+                with open(legacy_file, 'rb') as f:
+                    checkpoint = orjson.loads(f.read())
+                legacy_urls = checkpoint.get('collected_urls', [])
+                for url in legacy_urls:
+                    self.collected_urls.add(url)
+                self.new_urls.extend(legacy_urls)  # re-appended to JSONL on next save
+                print(f"Loaded legacy checkpoint with {len(self.collected_urls)} existing URLs")
+            except Exception as e:
+                print(f"Error loading legacy checkpoint: {e}")
+
     def save_checkpoint(self):
+        # Append only the URLs collected since the last save - O(new), not O(total)
+        if not self.new_urls:
+            return
         os.makedirs(os.path.dirname(self.checkpoint_file), exist_ok=True)
-        checkpoint = {
-            'collected_urls': list(self.collected_urls),
-            'last_run': datetime.now().isoformat(),
-            'total_articles': len(self.collected_urls)
-        }
-        with open(self.checkpoint_file, 'w') as f:
-            json.dump(checkpoint, f, indent=2)
-    
-    def get_articles_batch(self, page=1, date_offset=0):
+        now = datetime.now().isoformat()
+        with open(self.checkpoint_file, 'ab') as f:
+            for url in self.new_urls:
+                f.write(orjson.dumps({'url': url, 'ts': now}) + b'\n')
+        self.new_urls = []
+
+    async def get_articles_batch(self, session, page=1, date_offset=0, query=None):
         url = "https://newsapi.org/v2/everything"
-        
+
         # For free tier, we'll use date ranges instead of pagination
         from_date = (datetime.now() - timedelta(days=self.config.get('days_back', 7) + date_offset)).strftime('%Y-%m-%d')
         to_date = (datetime.now() - timedelta(days=date_offset)).strftime('%Y-%m-%d')
-        
+
         params = {
-            'q': self.config['query'],
+            'q': query if query is not None else self.config['query'],
             'language': self.config['language'],
             'pageSize': min(self.config.get('batch_size', 20), 100),  # Max 100 per request
             'from': from_date,
@@ -51,23 +73,29 @@ class StockNewsCrawler:
             'sortBy': 'publishedAt',
             'apiKey': self.config['api_key']
         }
-        
+
         # Only add page parameter if it's page 1 (free tier limitation)
         if page == 1:
             params['page'] = page
-        
+
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
+            # Retry transient failures with exponential backoff
+            for attempt in range(3):
+                async with session.get(url, params=params) as response:
+                    if response.status in (429, 500, 502, 503, 504) and attempt < 2:
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+                    response.raise_for_status()
+                    data = await response.json()
+                break
+
             articles = []
             new_articles = 0
-            
+
             if data['status'] == 'ok':
                 total_results = data.get('totalResults', 0)
                 print(f"Date range {from_date} to {to_date}: Found {len(data['articles'])} articles (Total available: {total_results})")
-                
+
                 for article in data['articles']:
                     article_url = article.get('url', '')
                     if article_url and article_url not in self.collected_urls:
@@ -83,116 +111,107 @@ class StockNewsCrawler:
                             'date_range': f"{from_date}_to_{to_date}"
                         })
                         self.collected_urls.add(article_url)
+                        self.new_urls.append(article_url)
                         new_articles += 1
-                
+
                 print(f"New articles in this batch: {new_articles}")
-            
+
             return articles, total_results
-            
-        except requests.exceptions.RequestException as e:
+
+        except aiohttp.ClientError as e:
             print(f"Error fetching articles: {e}")
             return [], 0
         except Exception as e:
             print(f"Error processing articles: {e}")
             return [], 0
-    
+
     def save_json(self, articles, batch_num):
         data_path = self.config.get('data_path', 'data')
         os.makedirs(data_path, exist_ok=True)
-        
+
         filename = f"stock_news_batch_{batch_num}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         filepath = os.path.join(data_path, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(articles, f, ensure_ascii=False, indent=2)
+
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(articles, option=orjson.OPT_INDENT_2))
         return filepath
-    
-    def run(self):
+
+    async def run(self):
         all_articles = []
         batch_num = 1
-        date_offset = 0
         max_total = self.config.get('max_total_articles', 1000)
         batch_size = self.config.get('batch_size', 20)
         max_days_back = self.config.get('days_back', 7)
-        
+
         print(f"Starting crawl with checkpoint of {len(self.collected_urls)} existing URLs")
         print(f"Target: {max_total} total articles, {batch_size} per batch")
         print(f"Strategy: Using date ranges over {max_days_back} days to get more articles")
-        
-        # First, try to get articles from current date range
-        articles, total_results = self.get_articles_batch(1, 0)
-        if articles:
-            all_articles.extend(articles)
-            filename = self.save_json(articles, batch_num)
-            print(f"Batch {batch_num}: Saved {len(articles)} new articles to {filename}")
-            self.save_checkpoint()
-            batch_num += 1
-        
-        # Then use different search strategies to get more articles
+
+        # Different search strategies to get more articles
         search_strategies = [
             "stock market news",
             "financial news",
-            "investment news", 
+            "investment news",
             "market analysis",
             "economic news",
             "trading news",
             "business news"
         ]
-        
-        original_query = self.config['query']
-        
-        for strategy in search_strategies:
-            if len(all_articles) >= max_total:
-                break
-                
-            print(f"\n--- Trying search strategy: '{strategy}' ---")
-            self.config['query'] = strategy
-            
-            articles, _ = self.get_articles_batch(1, 0)
-            
-            if articles:
-                all_articles.extend(articles)
-                filename = self.save_json(articles, batch_num)
-                print(f"Batch {batch_num}: Saved {len(articles)} new articles to {filename}")
-                self.save_checkpoint()
-                batch_num += 1
-            
-            time.sleep(2)  # Rate limiting
-        
-        # Restore original query
-        self.config['query'] = original_query
-        
-        # Try different date ranges if we still need more articles
-        date_offset = 1
-        while len(all_articles) < max_total and date_offset <= max_days_back:
-            print(f"\n--- Fetching older articles (offset: {date_offset} days) ---")
-            
-            articles, total_results = self.get_articles_batch(1, date_offset)
-            
+
+        # Cap concurrency so we stay inside NewsAPI rate limits
+        sem = asyncio.BoundedSemaphore(4)
+
+        async def fetch(query, date_offset):
+            async with sem:
+                result = await self.get_articles_batch(session, 1, date_offset, query=query)
+                await asyncio.sleep(2)  # Rate limiting
+                return result
+
+        # NewsAPI's q parameter supports boolean OR, so one request covers
+        # every strategy instead of one round trip each
+        combined_query = ' OR '.join(f'"{strategy}"' for strategy in search_strategies)
+
+        connector = aiohttp.TCPConnector(limit_per_host=4)
+        timeout = aiohttp.ClientTimeout(total=30, sock_connect=3.05)
+        # Cache responses on disk so re-runs over the same date windows
+        # hit SQLite instead of NewsAPI (and its quota)
+        cache = SQLiteBackend(
+            cache_name=os.path.join(self.config.get('data_path', 'data'), 'newsapi_cache'),
+            expire_after=self.config.get('http_cache_ttl', 3600),
+            allowed_methods=['GET'])
+        async with CachedSession(cache=cache, connector=connector, timeout=timeout) as session:
+            # Current date range with the configured query, the combined
+            # strategy query, then older date ranges - fetched concurrently
+            tasks = [fetch(self.config['query'], 0), fetch(combined_query, 0)]
+            tasks.extend(fetch(self.config['query'], offset) for offset in range(1, max_days_back + 1))
+
+            results = await asyncio.gather(*tasks)
+
+        # Save every fetched batch; the quota is spent either way and
+        # max_total is just the target
+        for articles, _ in results:
             if not articles:
-                print("No new articles found in this date range")
-                date_offset += 1
                 continue
-            
+
             all_articles.extend(articles)
-            
             filename = self.save_json(articles, batch_num)
             print(f"Batch {batch_num}: Saved {len(articles)} new articles to {filename}")
-            
-            self.save_checkpoint()
-            
+
             print(f"Progress: {len(all_articles)}/{max_total} articles collected")
             batch_num += 1
-            date_offset += 1
-            time.sleep(2)  # Rate limiting
-        
+
+        # Checkpoint only after every batch is on disk: a crash before this
+        # re-fetches duplicates next run (absorbed by URL dedup), never
+        # checkpoints URLs whose articles were lost
+        self.save_checkpoint()
+
         print(f"\nCrawling completed:")
         print(f"Total new articles collected: {len(all_articles)}")
         print(f"Total unique URLs in checkpoint: {len(self.collected_urls)}")
-        
+
         return all_articles
 
 
 if __name__ == "__main__":
     crawler = StockNewsCrawler()
-    crawler.run()
\ No newline at end of file
+    asyncio.run(crawler.run())
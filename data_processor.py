@@ -1,15 +1,56 @@
 import pandas as pd
-import json
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import ijson
+import orjson
 import os
+import re
 import glob
-import yaml
+from concurrent.futures import ThreadPoolExecutor
+from config_loader import load_config
 from datetime import datetime
+from joblib import Parallel, delayed
+
+# Stream batch files bigger than this instead of slurping them whole
+_LARGE_FILE_BYTES = 64 * 1024 * 1024
+
+# Below this, process spawn overhead outweighs parallel normalization
+_PARALLEL_MIN_ARTICLES = 50000
+
+_WS_RE = re.compile(r'\s+')
+
+
+def _normalize_chunk(articles):
+    # Module-level so joblib can pickle it for worker processes
+    df = pd.DataFrame(articles)
+
+    # Guard against batches that predate newer fields
+    text_columns = ['title', 'description', 'url', 'source', 'author', 'image_url', 'date_range']
+    for col in text_columns + ['published_at', 'scraped_at']:
+        if col not in df.columns:
+            df[col] = ''
+        df[col] = df[col].fillna('')
+
+    # Collapse runs of whitespace - vectorized instead of per-row clean_text
+    for col in ['title', 'description', 'author']:
+        df[col] = df[col].str.replace(_WS_RE, ' ', regex=True).str.strip()
+
+    df['has_image'] = df['image_url'] != ''
+    df['has_author'] = df['author'] != ''
+    df['domain'] = df['url'].str.extract(r'^https?://([^/]+)', expand=False).fillna('')
+    df['word_count'] = df['description'].str.split().str.len()
+
+    df['published_at'] = pd.to_datetime(df['published_at'], format='ISO8601', utc=True, errors='coerce')
+    df['scraped_at'] = pd.to_datetime(df['scraped_at'], format='ISO8601', utc=True, errors='coerce')
+    df['published_date'] = df['published_at'].dt.date
+    df['scraped_date'] = df['scraped_at'].dt.date
+
+    return df
 
 
 class StockNewsProcessor:
     def __init__(self):
-        with open('config.yaml', 'r') as f:
-            self.config = yaml.safe_load(f)
+        self.config = load_config()
         self.data_dir = self.config.get('data_path', 'data')
         self.processed_dir = self.config.get('processed_data_path', 'processed_data')
         self.ensure_directories()
@@ -19,114 +60,88 @@ class StockNewsProcessor:
     
     def load_json_files(self):
         json_files = glob.glob(os.path.join(self.data_dir, "stock_news_batch_*.json"))
-        all_articles = []
-        
+
         print(f"Found {len(json_files)} JSON files to process")
-        
-        for file_path in json_files:
+
+        if not json_files:
+            return []
+
+        # Files above the threshold are streamed with ijson so memory stays
+        # bounded by one article; the rest take the orjson fast path
+        large_files = {f for f in json_files if os.path.getsize(f) > _LARGE_FILE_BYTES}
+        small_files = [f for f in json_files if f not in large_files]
+
+        all_articles = []
+        seen_urls = set()
+
+        def add_article(article):
+            # Skip URLs we already have so duplicates never reach normalization
+            url = article.get('url', '')
+            if url and url in seen_urls:
+                return False
+            seen_urls.add(url)
+            all_articles.append(article)
+            return True
+
+        def load_one(file_path):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        all_articles.extend(data)
-                    else:
-                        all_articles.append(data)
-                print(f"Loaded {len(data)} articles from {os.path.basename(file_path)}")
+                with open(file_path, 'rb') as f:
+                    data = orjson.loads(f.read())
+                if not isinstance(data, list):
+                    data = [data]
+                return file_path, data, None
+            except Exception as e:
+                return file_path, [], e
+
+        if small_files:
+            # Read and parse files concurrently; log after so output stays ordered
+            with ThreadPoolExecutor(max_workers=min(16, len(small_files))) as executor:
+                results = list(executor.map(load_one, small_files))
+
+            for file_path, data, error in results:
+                if error is not None:
+                    print(f"Error loading {file_path}: {error}")
+                    continue
+                new_count = sum(add_article(article) for article in data)
+                print(f"Loaded {new_count} articles from {os.path.basename(file_path)}")
+
+        for file_path in sorted(large_files):
+            try:
+                new_count = 0
+                with open(file_path, 'rb') as f:
+                    for article in ijson.items(f, 'item'):
+                        new_count += add_article(article)
+                print(f"Loaded {new_count} articles from {os.path.basename(file_path)} (streamed)")
             except Exception as e:
                 print(f"Error loading {file_path}: {e}")
-        
+
         return all_articles
     
-    def normalize_data(self, articles):
+    def create_dataframe(self, articles):
         print(f"Normalizing {len(articles)} articles...")
-        
-        normalized_data = []
-        
-        for article in articles:
-            normalized_article = {
-                'title': self.clean_text(article.get('title', '')),
-                'description': self.clean_text(article.get('description', '')),
-                'url': article.get('url', ''),
-                'source': article.get('source', ''),
-                'published_at': self.normalize_datetime(article.get('published_at', '')),
-                'author': self.clean_text(article.get('author', '')),
-                'image_url': article.get('image_url', ''),
-                'scraped_at': self.normalize_datetime(article.get('scraped_at', '')),
-                'date_range': article.get('date_range', ''),
-                'has_image': bool(article.get('image_url', '')),
-                'has_author': bool(article.get('author', '')),
-                'domain': self.extract_domain(article.get('url', '')),
-                'published_date': self.extract_date_only(article.get('published_at', '')),
-                'scraped_date': self.extract_date_only(article.get('scraped_at', '')),
-                'word_count': self.count_words(article.get('description', ''))
-            }
-            normalized_data.append(normalized_article)
-        
-        return normalized_data
-    
-    def clean_text(self, text):
-        if not text or text.strip() == '':
-            return ''
-        return ' '.join(text.strip().split())
-    
-    def normalize_datetime(self, dt_string):
-        if not dt_string:
-            return ''
-        try:
-            if 'T' in dt_string:
-                dt = datetime.fromisoformat(dt_string.replace('Z', '+00:00'))
-            else:
-                dt = datetime.strptime(dt_string, '%Y-%m-%d %H:%M:%S')
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            return dt_string
-    
-    def extract_domain(self, url):
-        if not url:
-            return ''
-        try:
-            from urllib.parse import urlparse
-            return urlparse(url).netloc
-        except:
-            return ''
-    
-    def extract_date_only(self, dt_string):
-        if not dt_string:
-            return ''
-        try:
-            if 'T' in dt_string:
-                dt = datetime.fromisoformat(dt_string.replace('Z', '+00:00'))
-            else:
-                dt = datetime.strptime(dt_string, '%Y-%m-%d %H:%M:%S')
-            return dt.strftime('%Y-%m-%d')
-        except:
-            return ''
-    
-    def count_words(self, text):
-        if not text:
-            return 0
-        return len(text.split())
-    
-    def create_dataframe(self, normalized_data):
-        df = pd.DataFrame(normalized_data)
-        
-        datetime_columns = ['published_at', 'scraped_at']
-        for col in datetime_columns:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce')
-        
-        date_columns = ['published_date', 'scraped_date']
-        for col in date_columns:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce').dt.date
-        
+
+        n_jobs = os.cpu_count() or 1
+        if len(articles) >= _PARALLEL_MIN_ARTICLES and n_jobs > 1:
+            # Fan the normalization out across cores and concat the parts
+            chunk_size = -(-len(articles) // n_jobs)
+            chunks = [articles[i:i + chunk_size] for i in range(0, len(articles), chunk_size)]
+            parts = Parallel(n_jobs=-1, backend='loky')(delayed(_normalize_chunk)(chunk) for chunk in chunks)
+            df = pd.concat(parts, ignore_index=True)
+        else:
+            df = _normalize_chunk(articles)
+
         original_count = len(df)
         df = df.drop_duplicates(subset=['url'], keep='first')
         removed_count = original_count - len(df)
-        
+
         if removed_count > 0:
             print(f"Removed {removed_count} duplicate articles")
-        
+
+        # Low-cardinality columns: int codes make nunique/value_counts much
+        # cheaper than hashing object strings, and cut column memory ~10x
+        for col in ['source', 'domain', 'date_range']:
+            df[col] = df[col].astype('category')
+
         return df
     
     def generate_summary_stats(self, df):
@@ -147,7 +162,9 @@ class StockNewsProcessor:
             filename = f"stock_news_processed_{timestamp}.csv"
         
         filepath = os.path.join(self.processed_dir, filename)
-        df.to_csv(filepath, index=False, encoding='utf-8', sep='\t')
+        # pyarrow's columnar CSV writer formats rows in C++, well ahead of df.to_csv
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pacsv.write_csv(table, filepath, write_options=pacsv.WriteOptions(delimiter='\t'))
         print(f"Saved processed data to {filepath}")
         return filepath
     
@@ -157,8 +174,8 @@ class StockNewsProcessor:
             filename = f"summary_stats_{timestamp}.json"
         
         filepath = os.path.join(self.processed_dir, filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, indent=2, default=str)
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(stats, option=orjson.OPT_INDENT_2, default=str))
         print(f"Saved summary statistics to {filepath}")
         return filepath
     
@@ -171,9 +188,7 @@ class StockNewsProcessor:
             print("No articles found to process")
             return
         
-        normalized_data = self.normalize_data(articles)
-        
-        df = self.create_dataframe(normalized_data)
+        df = self.create_dataframe(articles)
         
         stats = self.generate_summary_stats(df)
         
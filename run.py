@@ -3,6 +3,7 @@
 Main script to run the stock news crawler and data processor
 """
 
+import asyncio
 import sys
 import os
 from crawler import StockNewsCrawler
@@ -22,7 +23,7 @@ def main():
         elif sys.argv[1] == '--crawl-only':
             print("Running crawler only...")
             crawler = StockNewsCrawler()
-            crawler.run()
+            asyncio.run(crawler.run())
             return
         elif sys.argv[1] == '--sql-only':
             print("Generating SQL only...")
@@ -32,7 +33,7 @@ def main():
         elif sys.argv[1] == '--full':
             print("Running complete pipeline...")
             crawler = StockNewsCrawler()
-            articles = crawler.run()
+            articles = asyncio.run(crawler.run())
             
             if articles:
                 print(f"\nStep 2: Processing {len(articles)} articles...")
@@ -51,7 +52,7 @@ def main():
     
     print("Running crawler and processor...")
     crawler = StockNewsCrawler()
-    articles = crawler.run()
+    articles = asyncio.run(crawler.run())
     
     if articles:
         print(f"\nStep 2: Processing {len(articles)} articles...")
@@ -1,47 +1,129 @@
-import json
+import ijson
+import orjson
 import os
 import glob
 import re
-import yaml
+from concurrent.futures import ThreadPoolExecutor
+from config_loader import load_config
 from datetime import datetime
-from urllib.parse import urlparse
+
+# Stream batch files bigger than this instead of slurping them whole
+_LARGE_FILE_BYTES = 64 * 1024 * 1024
+
+_WS_RE = re.compile(r'\s+')
+_DOMAIN_RE = re.compile(r'^https?://([^/]+)')
+
+# Double quotes and strip NUL bytes (invalid in Postgres text) in one C
+# loop; backslashes stay literal under standard_conforming_strings
+_SQL_TRANS = str.maketrans({"'": "''", '\x00': None})
+
+
+def _format_str(value):
+    if value is None:
+        return 'NULL'
+    return "'" + value.translate(_SQL_TRANS) + "'"
+
+
+def _format_bool(value):
+    return 'TRUE' if value else 'FALSE'
 
 
 class SQLGenerator:
+    COLUMNS = [
+        'url', 'title', 'description', 'source', 'author',
+        'published_at', 'scraped_at', 'image_url', 'domain',
+        'word_count', 'has_image', 'has_author'
+    ]
+
+    # Column types are fixed by the schema, so each column gets its
+    # formatter picked once instead of isinstance dispatch per cell
+    COLUMN_FORMATTERS = {
+        'url': _format_str,
+        'title': _format_str,
+        'description': _format_str,
+        'source': _format_str,
+        'author': _format_str,
+        'published_at': _format_str,
+        'scraped_at': _format_str,
+        'image_url': _format_str,
+        'domain': _format_str,
+        'word_count': str,
+        'has_image': _format_bool,
+        'has_author': _format_bool
+    }
+
     def __init__(self):
-        with open('config.yaml', 'r') as f:
-            self.config = yaml.safe_load(f)
+        self.config = load_config()
         self.data_dir = self.config.get('data_path', 'data')
         self.output_dir = self.config.get('sql_path', 'sql')
         self.table_name = "stock_articles"
+        self.row_formatters = [(col, self.COLUMN_FORMATTERS[col]) for col in self.COLUMNS]
         os.makedirs(self.output_dir, exist_ok=True)
     
     def load_json_files(self):
         json_files = glob.glob(os.path.join(self.data_dir, "stock_news_batch_*.json"))
-        all_articles = []
-        
+
         print(f"Found {len(json_files)} JSON files to process")
-        
-        for file_path in json_files:
+
+        if not json_files:
+            return []
+
+        # Files above the threshold are streamed with ijson so memory stays
+        # bounded by one article; the rest take the orjson fast path
+        large_files = {f for f in json_files if os.path.getsize(f) > _LARGE_FILE_BYTES}
+        small_files = [f for f in json_files if f not in large_files]
+
+        all_articles = []
+        seen_urls = set()
+
+        def add_article(article):
+            # Skip URLs we already have so duplicates never reach normalization
+            url = article.get('url', '')
+            if url and url in seen_urls:
+                return False
+            seen_urls.add(url)
+            all_articles.append(article)
+            return True
+
+        def load_one(file_path):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        all_articles.extend(data)
-                    else:
-                        all_articles.append(data)
-                print(f"Loaded {len(data)} articles from {os.path.basename(file_path)}")
+                with open(file_path, 'rb') as f:
+                    data = orjson.loads(f.read())
+                if not isinstance(data, list):
+                    data = [data]
+                return file_path, data, None
+            except Exception as e:
+                return file_path, [], e
+
+        if small_files:
+            # Read and parse files concurrently; log after so output stays ordered
+            with ThreadPoolExecutor(max_workers=min(16, len(small_files))) as executor:
+                results = list(executor.map(load_one, small_files))
+
+            for file_path, data, error in results:
+                if error is not None:
+                    print(f"Error loading {file_path}: {error}")
+                    continue
+                new_count = sum(add_article(article) for article in data)
+                print(f"Loaded {new_count} articles from {os.path.basename(file_path)}")
+
+        for file_path in sorted(large_files):
+            try:
+                new_count = 0
+                with open(file_path, 'rb') as f:
+                    for article in ijson.items(f, 'item'):
+                        new_count += add_article(article)
+                print(f"Loaded {new_count} articles from {os.path.basename(file_path)} (streamed)")
             except Exception as e:
                 print(f"Error loading {file_path}: {e}")
-        
+
         return all_articles
     
     def clean_text(self, text):
-        if not text or text.strip() == '':
+        if not text:
             return None
-        text = ' '.join(text.strip().split())
-        text = text.replace("'", "''")
-        return text
+        text = _WS_RE.sub(' ', text).strip()
+        return text or None
     
     def normalize_datetime(self, dt_string):
         if not dt_string:
@@ -58,25 +140,14 @@ class SQLGenerator:
     def extract_domain(self, url):
         if not url:
             return None
-        try:
-            return urlparse(url).netloc
-        except:
-            return None
+        m = _DOMAIN_RE.match(url)
+        return m.group(1) if m else None
     
     def count_words(self, text):
         if not text:
             return 0
         return len(text.split())
     
-    def escape_sql_value(self, value):
-        if value is None:
-            return 'NULL'
-        if isinstance(value, str):
-            return f"'{value}'"
-        if isinstance(value, bool):
-            return 'TRUE' if value else 'FALSE'
-        return str(value)
-    
     def transform_article(self, article):
         return {
             'url': self.clean_text(article.get('url', '')),
@@ -93,6 +164,31 @@ class SQLGenerator:
             'has_author': bool(article.get('author', ''))
         }
     
+    def load_to_database(self, articles):
+        dsn = self.config.get('database_url')
+        if not dsn:
+            return
+        import psycopg2
+        from psycopg2.extras import execute_values
+
+        rows = []
+        for article in articles:
+            transformed = self.transform_article(article)
+            rows.append(tuple(transformed.get(col) for col in self.COLUMNS))
+
+        insert_sql = f"INSERT INTO {self.table_name} ({', '.join(self.COLUMNS)}) VALUES %s ON CONFLICT (url) DO NOTHING"
+
+        conn = psycopg2.connect(dsn)
+        try:
+            with conn, conn.cursor() as cur:
+                cur.execute(self.generate_create_table_sql())
+                # Batch-formats rows in C and parameterizes safely
+                execute_values(cur, insert_sql, rows, page_size=1000)
+        finally:
+            conn.close()
+
+        print(f"Loaded {len(rows)} articles into {self.table_name}")
+
     def generate_create_table_sql(self):
         sql = f"""
 CREATE TABLE IF NOT EXISTS {self.table_name} (
@@ -120,67 +216,29 @@ CREATE INDEX IF NOT EXISTS idx_stock_articles_domain ON {self.table_name}(domain
 """
         return sql
     
-    def generate_insert_sql(self, articles):
-        if not articles:
-            return ""
-        
-        columns = [
-            'url', 'title', 'description', 'source', 'author',
-            'published_at', 'scraped_at', 'image_url', 'domain',
-            'word_count', 'has_image', 'has_author'
-        ]
-        
-        sql_parts = [f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES"]
-        
-        values = []
-        for article in articles:
-            transformed = self.transform_article(article)
-            row_values = []
-            for col in columns:
-                row_values.append(self.escape_sql_value(transformed.get(col)))
-            values.append(f"({', '.join(row_values)})")
-        
-        sql_parts.append(',\n'.join(values))
-        sql_parts.append("ON CONFLICT (url) DO NOTHING;")
-        
-        return '\n'.join(sql_parts)
-    
-    def generate_upsert_sql(self, articles):
-        if not articles:
-            return ""
-        
-        columns = [
-            'url', 'title', 'description', 'source', 'author',
-            'published_at', 'scraped_at', 'image_url', 'domain',
-            'word_count', 'has_image', 'has_author'
-        ]
-        
-        update_columns = [col for col in columns if col != 'url']
-        
-        sql_parts = [f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES"]
-        
-        values = []
-        for article in articles:
-            transformed = self.transform_article(article)
-            row_values = []
-            for col in columns:
-                row_values.append(self.escape_sql_value(transformed.get(col)))
-            values.append(f"({', '.join(row_values)})")
-        
-        sql_parts.append(',\n'.join(values))
-        
+    def _build_row(self, article):
+        transformed = self.transform_article(article)
+        row = ', '.join(fmt(transformed[col]) for col, fmt in self.row_formatters)
+        return f"({row})"
+
+    def _values_header(self):
+        return f"INSERT INTO {self.table_name} ({', '.join(self.COLUMNS)}) VALUES\n"
+
+    def _insert_footer(self):
+        return "\nON CONFLICT (url) DO NOTHING;\n"
+
+    def _upsert_footer(self):
+        update_columns = [col for col in self.COLUMNS if col != 'url']
         update_clause = ', '.join([f"{col} = EXCLUDED.{col}" for col in update_columns])
-        sql_parts.append(f"ON CONFLICT (url) DO UPDATE SET {update_clause}, updated_at = CURRENT_TIMESTAMP;")
-        
-        return '\n'.join(sql_parts)
-    
+        return f"\nON CONFLICT (url) DO UPDATE SET {update_clause}, updated_at = CURRENT_TIMESTAMP;\n"
+
     def save_sql_file(self, content, filename):
         filepath = os.path.join(self.output_dir, filename)
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
         print(f"Saved SQL to {filepath}")
         return filepath
-    
+
     def generate_all_sql(self):
         print("Starting SQL generation...")
         
@@ -196,24 +254,44 @@ CREATE INDEX IF NOT EXISTS idx_stock_articles_domain ON {self.table_name}(domain
         
         create_table_sql = self.generate_create_table_sql()
         create_table_file = self.save_sql_file(create_table_sql, f"create_table_{timestamp}.sql")
-        
-        insert_sql = self.generate_insert_sql(articles)
-        insert_file = self.save_sql_file(insert_sql, f"insert_articles_{timestamp}.sql")
-        
-        upsert_sql = self.generate_upsert_sql(articles)
-        upsert_file = self.save_sql_file(upsert_sql, f"upsert_articles_{timestamp}.sql")
-        
-        all_sql = f"""-- Complete SQL script for stock articles
--- Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
-{create_table_sql}
+        insert_file = os.path.join(self.output_dir, f"insert_articles_{timestamp}.sql")
+        upsert_file = os.path.join(self.output_dir, f"upsert_articles_{timestamp}.sql")
+        combined_file = os.path.join(self.output_dir, f"complete_sql_{timestamp}.sql")
+
+        # One pass over the articles: each row string is built once and
+        # written to the insert, upsert and combined scripts together
+        with open(insert_file, 'w', encoding='utf-8', buffering=1 << 16) as insert_fp, \
+                open(upsert_file, 'w', encoding='utf-8', buffering=1 << 16) as upsert_fp, \
+                open(combined_file, 'w', encoding='utf-8', buffering=1 << 16) as combined_fp:
+            combined_fp.write("-- Complete SQL script for stock articles\n")
+            combined_fp.write(f"-- Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            combined_fp.write(f"\n{create_table_sql}\n")
+            combined_fp.write("\n-- Insert new articles only (skip duplicates)\n")
+
+            header = self._values_header()
+            for fp in (insert_fp, upsert_fp, combined_fp):
+                fp.write(header)
+
+            first = True
+            for article in articles:
+                row = self._build_row(article)
+                chunk = row if first else f",\n{row}"
+                for fp in (insert_fp, upsert_fp, combined_fp):
+                    fp.write(chunk)
+                first = False
+
+            insert_footer = self._insert_footer()
+            insert_fp.write(insert_footer)
+            combined_fp.write(insert_footer)
+            upsert_fp.write(self._upsert_footer())
+
+        for filepath in (insert_file, upsert_file, combined_file):
+            print(f"Saved SQL to {filepath}")
+
+        if self.config.get('database_url'):
+            self.load_to_database(articles)
 
--- Insert new articles only (skip duplicates)
-{insert_sql}
-"""
-        
-        combined_file = self.save_sql_file(all_sql, f"complete_sql_{timestamp}.sql")
-        
         print(f"\nSQL generation completed!")
         print(f"Total articles processed: {len(articles)}")
         print(f"Files generated:")